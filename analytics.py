@@ -0,0 +1,150 @@
+"""Price and inventory aggregates for the analytics panel.
+
+The catalog is aggregated once per data version into a cube of count and
+min / median / max price and carat per gemstone x shape x origin x
+certification. Summaries for a sidebar selection are then answered from
+the cube cells instead of rescanning the catalog.
+"""
+
+import numpy as np
+
+CUBE_DIMENSIONS = ["gemstone", "shape", "origin", "certification"]
+CUBE_MEASURES = ["price", "carat_weight"]
+
+# Placeholder price shown as "Call for Price"; not a real price
+CALL_FOR_PRICE = 700000
+
+
+class _RankIndex:
+    """Exact order statistics over any set of cube cells for one measure.
+
+    Every value gets its rank within the whole catalog, and the ranks are
+    stored sorted by (cell, rank). The k-th smallest value over a set of
+    cells is then found by bisecting on the rank, counting per cell with a
+    binary search: no pass over the individual values is needed.
+    """
+
+    def __init__(self, values, cell_ids, n_cells):
+        valid = ~np.isnan(values)
+        values, cell_ids = values[valid], cell_ids[valid]
+        order = np.argsort(values, kind="mergesort")
+        ranks = np.empty(len(values), dtype=np.int64)
+        ranks[order] = np.arange(len(values))
+
+        self.values = values[order]
+        self.keys = np.sort(cell_ids.astype(np.int64) * len(values) + ranks)
+        self.starts = np.searchsorted(self.keys, np.arange(n_cells, dtype=np.int64) * len(values))
+
+    def kth(self, cell_ids, k):
+        """The k-th smallest (0-based) value over the given cells."""
+        n = len(self.values)
+        base = cell_ids.astype(np.int64) * n
+        lo, hi = 0, n - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            count = (np.searchsorted(self.keys, base + mid, side="right") - self.starts[cell_ids]).sum()
+            if count > k:
+                hi = mid
+            else:
+                lo = mid + 1
+        return float(self.values[lo])
+
+    def median(self, cell_ids, count):
+        low = self.kth(cell_ids, (count - 1) // 2)
+        if count % 2:
+            return low
+        return (low + self.kth(cell_ids, count // 2)) / 2
+
+
+class PriceCube:
+    """Cube cells plus what is needed to summarize any selection of them.
+
+    cells has one row per dimension combination with count and
+    min / median / max per measure. The summary of the whole catalog is
+    computed once, when the cube is built.
+    """
+
+    def __init__(self, cells, ranks):
+        self.cells = cells
+        self.ranks = ranks
+        self.total = summarize(self, cells)
+
+
+def build_cube(df):
+    """Aggregate the catalog into a PriceCube.
+
+    Dimension values are stored as their filter labels, so missing values
+    and the string "None" share the "None" cell, as in the sidebar filters.
+    "Call for Price" items are counted in call_for_price and left out of the
+    price measures.
+    """
+    dims = [d for d in CUBE_DIMENSIONS if d in df.columns]
+    measures = [m for m in CUBE_MEASURES if m in df.columns]
+
+    keys = []
+    for d in dims:
+        labels = df[d].astype(object)
+        keys.append(labels.where(labels.notna(), "None").astype(str).rename(d))
+
+    values = df[measures].copy()
+    aggregations = {"count": (measures[0], "size")}
+    if "price" in values.columns:
+        call_for_price = values["price"] == CALL_FOR_PRICE
+        values["call_for_price"] = call_for_price
+        values.loc[call_for_price, "price"] = np.nan
+        aggregations["call_for_price"] = ("call_for_price", "sum")
+    for m in measures:
+        aggregations[f"{m}_count"] = (m, "count")
+        aggregations[f"{m}_min"] = (m, "min")
+        aggregations[f"{m}_median"] = (m, "median")
+        aggregations[f"{m}_max"] = (m, "max")
+
+    grouped = values.groupby(keys)
+    cells = grouped.agg(**aggregations).reset_index()
+    # Group numbers follow the row order of the aggregated cells
+    cell_ids = grouped.ngroup().to_numpy()
+    ranks = {
+        m: _RankIndex(values[m].to_numpy(dtype=float), cell_ids, len(cells))
+        for m in measures
+    }
+    return PriceCube(cells, ranks)
+
+
+def select_cells(cube, selections):
+    """Cube cells matching the selected labels of the cube dimensions.
+
+    Selections on columns that are not cube dimensions are ignored.
+    """
+    cells = cube.cells
+    mask = np.ones(len(cells), dtype=bool)
+    for col, values in selections.items():
+        if col in cells.columns and col in CUBE_DIMENSIONS and values:
+            mask &= cells[col].isin(values).to_numpy()
+    return cells[mask]
+
+
+def summarize(cube, cells):
+    """Combine cube cells (rows of cube.cells) into one summary.
+
+    Count, min and max come from the cells. The median is exact: it is found
+    with the cube's rank index, without touching the individual values.
+    """
+    if getattr(cube, "total", None) is not None and len(cells) == len(cube.cells):
+        return cube.total
+
+    summary = {"count": int(cells["count"].sum()) if len(cells) else 0}
+    if "call_for_price" in cells.columns:
+        summary["call_for_price"] = int(cells["call_for_price"].sum())
+    for m in CUBE_MEASURES:
+        if f"{m}_count" not in cells.columns:
+            continue
+        valid = cells[cells[f"{m}_count"] > 0]
+        if valid.empty:
+            summary[m] = {"min": None, "median": None, "max": None}
+            continue
+        summary[m] = {
+            "min": float(valid[f"{m}_min"].min()),
+            "median": cube.ranks[m].median(valid.index.to_numpy(), int(valid[f"{m}_count"].sum())),
+            "max": float(valid[f"{m}_max"].max()),
+        }
+    return summary
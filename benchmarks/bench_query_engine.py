@@ -0,0 +1,77 @@
+"""Compare the pandas and DuckDB query engines on a synthetic catalog.
+
+Usage: python benchmarks/bench_query_engine.py [rows]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_engine import ENGINES, duckdb  # noqa: E402
+
+FACETS = {
+    "gemstone": ["Ruby", "Emerald", "Blue Sapphire", "Yellow Sapphire", "Pearl", None],
+    "shape": ["Oval", "Round", "Cushion", "Pear", None],
+    "cut": ["Faceted", "Cabochon", None],
+    "treatment": ["Unheated", "Heated", None],
+    "origin": ["Burma", "Sri Lanka", "Colombia", "Zambia", None],
+    "j_colour": ["Red", "Green", "Blue", "Yellow", "White"],
+    "dimension_type": ["mm", "cm"],
+    "product_type": ["Loose", "Ring"],
+    "certification": ["GIA", "IGI", "GRS", None],
+}
+
+
+def make_catalog(rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({col: pd.Categorical(rng.choice(values, rows)) for col, values in FACETS.items()})
+    df["sku"] = [f"GP{i}" for i in range(rows)]
+    df["name"] = df["gemstone"].astype(str) + " " + df["sku"]
+    df["price"] = rng.integers(1_000, 500_000, rows).astype(float)
+    df["carat_weight"] = rng.uniform(0.5, 12.0, rows).round(2)
+    df["weight_ratti"] = (df["carat_weight"] * 1.1).round(2)
+    return df
+
+
+def run(engine, df, sort_by):
+    # Same data version on every run, as on reruns of the app
+    state = engine.scan(df, [*FACETS, "price", "carat_weight", "weight_ratti"], version=1)
+    for col, values in [("gemstone", ["Ruby", "Emerald"]), ("shape", ["Oval"]), ("origin", ["Burma", "None"])]:
+        engine.facet_options(state, col)
+        state = engine.filter_facet(state, col, values)
+    for col in ["cut", "treatment", "j_colour", "dimension_type", "product_type", "certification"]:
+        engine.facet_options(state, col)
+    return engine.query(
+        state, {"price": (5_000.0, 300_000.0), "carat_weight": (1.0, 8.0)}, sort_by=sort_by, ascending=False
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    repeat = 5
+    df = make_catalog(rows)
+
+    for name, engine_cls in ENGINES.items():
+        if name == "duckdb" and duckdb is None:
+            print(f"{name:>8}: skipped (duckdb not installed)")
+            continue
+        engine = engine_cls()
+        for sort_by in ["price", "name"]:
+            run(engine, df, sort_by)  # warm up
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = run(engine, df, sort_by)
+            elapsed = (time.perf_counter() - start) / repeat
+            print(
+                f"{name:>8}: {elapsed * 1000:8.1f} ms per cascade + query sorted by {sort_by} "
+                f"({len(result):,} of {rows:,} rows)"
+            )
+
+
+if __name__ == "__main__":
+    main()
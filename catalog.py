@@ -0,0 +1,99 @@
+"""Loading-time processing of the exported product report.
+
+process_dataframe() filters the export down to sellable gemstones and builds
+the product and image URLs. compact_dataframe() then stores the catalog
+compactly: facet columns as categoricals and URLs without their shared
+prefixes, which expand_urls() adds back for the rows being displayed.
+"""
+
+import pandas as pd
+
+PRODUCT_URL_PREFIX = "https://www.gempundit.com/products/"
+IMAGE_URL_PREFIX = "https://imgcdn1.gempundit.com/media/catalog/product/"
+
+# Low-cardinality columns stored as categoricals (also the cascading filters)
+FACET_COLUMNS = [
+    "gemstone", "shape", "cut", "treatment", "origin", "j_colour",
+    "dimension_type", "product_type", "certification"
+]
+
+
+def process_dataframe(df):
+    # Numeric conversions
+    df["qty"] = pd.to_numeric(df["qty"], errors="coerce")
+    df["is_in_stock"] = pd.to_numeric(df["is_in_stock"], errors="coerce")
+    
+    # Filter Logic (Base filters)
+    df_gemstone = df[
+        (df["attribute_set_id"] == "Gemstones")
+        & df["sku"].astype(str).str.contains("GP", na=False)
+        & (df["qty"] > 0)
+        & (df["is_in_stock"] == 1)
+        & (~df["product_type"].fillna("").str.contains("pendant", case=False, na=False))
+        & (df["price"] > 0)
+    ].copy()
+
+    # Numeric Formatting Helpers
+    numeric_cols = ["carat_weight", "weight_ratti", "price"]
+    for col in numeric_cols:
+        if col in df_gemstone.columns:
+            df_gemstone[col] = pd.to_numeric(df_gemstone[col], errors="coerce")
+
+    # URL / Image Formatting
+    if "url_key" in df_gemstone.columns:
+        df_gemstone["url_key"] = df_gemstone["url_key"].fillna("").astype(str)
+        df_gemstone["url_key"] = PRODUCT_URL_PREFIX + df_gemstone["url_key"].str.lstrip("/")
+
+    if "image" in df_gemstone.columns:
+        def get_magento_url(img_name):
+            if pd.isna(img_name) or img_name == "":
+                return ""
+            
+            # Extract filename only in case input is "g/p/gp123.jpg"
+            full_str = str(img_name).strip()
+            filename = full_str.split('/')[-1]
+            
+            s = filename.lower()
+            
+            # Fix: Some CSV entries miss the 'gp' prefix which exists on server
+            if not s.startswith("gp"):
+                s = "gp" + s
+                
+            if len(s) >= 2:
+                # Standard Magento: /a/b/abc.jpg
+                return f"{IMAGE_URL_PREFIX}{s[0]}/{s[1]}/{s}"
+            return f"{IMAGE_URL_PREFIX}{s}"
+
+        df_gemstone["image"] = df_gemstone["image"].apply(get_magento_url)
+        
+    return df_gemstone
+
+
+def compact_dataframe(df):
+    """Store the low-cardinality facet columns as categoricals and the URLs
+    without their shared prefixes (rebuilt by expand_urls() for display).
+
+    Returns the compacted frame and the measured number of bytes saved.
+    """
+    facet_cols = [c for c in FACET_COLUMNS if c in df.columns]
+    url_cols = [c for c in ["url_key", "image"] if c in df.columns]
+    bytes_before = df[facet_cols + url_cols].memory_usage(index=False, deep=True).sum()
+
+    df = df.astype({c: "category" for c in facet_cols})
+    if "url_key" in df.columns:
+        df["url_key"] = df["url_key"].str.removeprefix(PRODUCT_URL_PREFIX)
+    if "image" in df.columns:
+        df["image"] = df["image"].str.removeprefix(IMAGE_URL_PREFIX)
+
+    bytes_after = df[facet_cols + url_cols].memory_usage(index=False, deep=True).sum()
+    return df, int(bytes_before - bytes_after)
+
+
+def expand_urls(df):
+    """Return a copy of df with the full product and image URLs rebuilt."""
+    df = df.copy()
+    if "url_key" in df.columns:
+        df["url_key"] = PRODUCT_URL_PREFIX + df["url_key"]
+    if "image" in df.columns:
+        df["image"] = df["image"].where(df["image"] == "", IMAGE_URL_PREFIX + df["image"])
+    return df
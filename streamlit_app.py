@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 import requests
+import os
 from io import StringIO
 
+from analytics import CALL_FOR_PRICE, CUBE_DIMENSIONS, CUBE_MEASURES, build_cube, select_cells, summarize
+from catalog import FACET_COLUMNS, compact_dataframe, expand_urls, process_dataframe
+from query_engine import get_engine
+
 # Page Config
 st.set_page_config(page_title="Gemstone Report Dashboard", layout="wide")
 
@@ -119,55 +124,26 @@ def load_data_from_url(url):
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
-def process_dataframe(df):
-    # Numeric conversions
-    df["qty"] = pd.to_numeric(df["qty"], errors="coerce")
-    df["is_in_stock"] = pd.to_numeric(df["is_in_stock"], errors="coerce")
-    
-    # Filter Logic (Base filters)
-    df_gemstone = df[
-        (df["attribute_set_id"] == "Gemstones")
-        & df["sku"].astype(str).str.contains("GP", na=False)
-        & (df["qty"] > 0)
-        & (df["is_in_stock"] == 1)
-        & (~df["product_type"].fillna("").str.contains("pendant", case=False, na=False))
-        & (df["price"] > 0)
-    ].copy()
-
-    # Numeric Formatting Helpers
-    numeric_cols = ["carat_weight", "weight_ratti", "price"]
-    for col in numeric_cols:
-        if col in df_gemstone.columns:
-            df_gemstone[col] = pd.to_numeric(df_gemstone[col], errors="coerce")
-
-    # URL / Image Formatting
-    if "url_key" in df_gemstone.columns:
-        df_gemstone["url_key"] = df_gemstone["url_key"].fillna("").astype(str)
-        df_gemstone["url_key"] = "https://www.gempundit.com/products/" + df_gemstone["url_key"].str.lstrip("/")
-
-    if "image" in df_gemstone.columns:
-        def get_magento_url(img_name):
-            if pd.isna(img_name) or img_name == "":
-                return ""
-            
-            # Extract filename only in case input is "g/p/gp123.jpg"
-            full_str = str(img_name).strip()
-            filename = full_str.split('/')[-1]
-            
-            s = filename.lower()
-            
-            # Fix: Some CSV entries miss the 'gp' prefix which exists on server
-            if not s.startswith("gp"):
-                s = "gp" + s
-                
-            if len(s) >= 2:
-                # Standard Magento: /a/b/abc.jpg
-                return f"https://imgcdn1.gempundit.com/media/catalog/product/{s[0]}/{s[1]}/{s}"
-            return f"https://imgcdn1.gempundit.com/media/catalog/product/{s}"
+# One engine (and DuckDB connection) per process, shared across reruns
+@st.cache_resource
+def load_query_engine(name):
+    return get_engine(name)
 
-        df_gemstone["image"] = df_gemstone["image"].apply(get_magento_url)
-        
-    return df_gemstone
+# Processing, compaction and the analytics cube run once per loaded data
+# version, not on every rerun
+@st.cache_data(ttl=3600)
+def load_catalog(url):
+    df_raw = load_data_from_url(url)
+    if df_raw.empty:
+        return df_raw, {}, None, None
+
+    df, memory_saved = compact_dataframe(process_dataframe(df_raw))
+    memory_stats = {"used": int(df.memory_usage(deep=True).sum()), "saved": memory_saved}
+    # Identifies this load, so the query engine can reuse its copy of the data
+    data_version = pd.Timestamp.now().isoformat()
+    cube_cols = [c for c in CUBE_DIMENSIONS + CUBE_MEASURES if c in df.columns]
+    price_cube = build_cube(df[cube_cols])
+    return df, memory_stats, data_version, price_cube
 
 # =========================
 # 2. Main Layout
@@ -194,15 +170,13 @@ RAW_URL = "https://staging.gempundit.com/var/export/report.csv"
 
 # Progress bar for loading
 progress_bar = st.progress(0, text="🔄 Loading gemstone data from server...")
-df_raw = load_data_from_url(RAW_URL)
-progress_bar.progress(50, text="⚙️ Processing data...")
+df_processed, memory_stats, data_version, price_cube = load_catalog(RAW_URL)
 
-if df_raw.empty:
+if df_processed.empty:
     progress_bar.empty()
     st.warning("No data available. Please try updating.")
     st.stop()
 
-df_processed = process_dataframe(df_raw)
 progress_bar.progress(100, text="✅ Data loaded successfully!")
 
 # Clear progress bar after a moment
@@ -214,9 +188,21 @@ progress_bar.empty()
 st.sidebar.image("https://cdn2.gempundit.com/skin/frontend/gempundit/default/images/logo.png", use_container_width=True)
 st.sidebar.header("Step 2: Filter Configuration")
 st.sidebar.markdown("Configure your filters below. Options update sequentially.")
-
-# We will apply filters sequentially to 'current_df' to determine options for the NEXT filter
-current_df = df_processed.copy()
+st.sidebar.caption(
+    f"Catalog: {len(df_processed):,} items, {memory_stats['used'] / 1e6:.1f} MB in memory "
+    f"({memory_stats['saved'] / 1e6:.1f} MB saved by compact storage)"
+)
+
+# Facet, range and sort queries go through the configured engine (pandas by default)
+try:
+    engine = load_query_engine(os.environ.get("QUERY_ENGINE", "pandas"))
+except (ImportError, ValueError) as e:
+    st.sidebar.warning(f"{e}. Using the pandas query engine.")
+    engine = load_query_engine("pandas")
+
+# Facet and range columns; sort-only columns are fetched for the matching rows
+query_columns = FACET_COLUMNS + ["price", "carat_weight", "weight_ratti"]
+query_state = engine.scan(df_processed, query_columns, version=data_version)
 
 # A. Dropdown Filters (Ordered List)
 # The order matters for cascading: Gemstone -> Shape -> Cut -> etc (User preference order)
@@ -237,29 +223,17 @@ filter_order = [
 selected_filters = {}
 
 for col_name, label in filter_order:
-    if col_name in current_df.columns:
-        # Handle NaN values by filling them with "None" so they are selectable
-        # We work on a temporary series to get options
-        temp_series = current_df[col_name].fillna("None").astype(str)
-        options = sorted(temp_series.unique())
+    if col_name in df_processed.columns:
+        # Options come from the rows left by the earlier filters, with NaN offered as "None"
+        options = engine.facet_options(query_state, col_name)
         
         # Multiselect
         val = st.sidebar.multiselect(f"{label}", options, key=f"filter_{col_name}")
         
         if val:
             # Apply filter immediately to setup next dropdowns
-            # If "None" is selected, we need to correct the filter logic to look for actual NaNs or the string "None"
-            
-            # Create a mask for filtering
-            mask = pd.Series(False, index=current_df.index)
-            
-            for v in val:
-                if v == "None":
-                    mask |= (current_df[col_name].isna()) | (current_df[col_name] == "None")
-                else:
-                    mask |= (current_df[col_name] == v)
-            
-            current_df = current_df[mask]
+            # "None" matches both actual NaNs and the string "None"
+            query_state = engine.filter_facet(query_state, col_name, val)
             selected_filters[col_name] = val
 
 st.sidebar.markdown("---")
@@ -388,39 +362,58 @@ if st.sidebar.button("Step 3: Apply Filters", type="primary", use_container_widt
 # 3. Results Display
 # =========================
 
+def show_analytics_panel():
+    # Answered from the precomputed cube, so it updates instantly with the sidebar
+    cells = select_cells(price_cube, selected_filters)
+    summary = summarize(price_cube, cells)
+
+    def fmt(val, fmt_str):
+        return "-" if val is None else fmt_str.format(val)
+
+    scope = " · ".join(label for col, label in filter_order if col in CUBE_DIMENSIONS)
+    with st.expander(f"📊 Price & Inventory Analytics (by {scope} only)", expanded=False):
+        m_count, m_price, m_carat = st.columns(3)
+        m_count.metric("Items", f"{summary['count']:,}")
+        if summary.get("call_for_price"):
+            m_count.caption(f"{summary['call_for_price']:,} Call for Price, not in price figures")
+        if "price" in summary:
+            price = summary["price"]
+            m_price.metric("Median Price", fmt(price["median"], "₹{:,.0f}"))
+            m_price.caption(f"Min {fmt(price['min'], '₹{:,.0f}')} · Max {fmt(price['max'], '₹{:,.0f}')}")
+        if "carat_weight" in summary:
+            carat = summary["carat_weight"]
+            m_carat.metric("Median Carat", fmt(carat["median"], "{:.2f}"))
+            m_carat.caption(f"Min {fmt(carat['min'], '{:.2f}')} · Max {fmt(carat['max'], '{:.2f}')}")
+
+        st.dataframe(
+            cells.sort_values("count", ascending=False),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption(
+            "Based on the Gemstone, Shape, Origin and Certification selections only; "
+            "the other dropdowns and the range filters are not applied, so these "
+            "figures can differ from the filtered results."
+        )
+
 if st.session_state["show_results"]:
     # Validation: Require specific 'gemstone' filter
     if "gemstone" not in selected_filters or not selected_filters["gemstone"]:
         st.warning("⚠ Please select a **Gemstone** to view the report.")
         st.stop()
 
-    # Apply Range Filters to the already dropdown-filtered 'current_df'
-    final_df = current_df.copy()
-    
-    for col, (sel_min, sel_max) in range_selections.items():
-        if col in final_df.columns:
-            final_df = final_df[
-                (final_df[col] >= sel_min) & (final_df[col] <= sel_max)
-            ]
-
     # --- Title ---
     st.title("💎 Filter Gemstone Data")
     
     # --- Formatting for Display (User Request: "Call for Price" if 700000) ---
     def format_price_display(val):
         try:
-            if float(val) == 700000:
+            if float(val) == CALL_FOR_PRICE:
                 return "Call for Price"
             return f"₹{val:,.0f}"
         except:
             return val
 
-    # Apply formatting to a new column so sorting (on original 'price') still works
-    final_df["display_price"] = final_df["price"].apply(format_price_display)
-
-    # --- Metrics (Calculated on Full Data) ---
-    # (Metrics currently hidden as per previous request, but available if needed)
-    
     # --- Controls Layout (View Mode + Sort) ---
     c_view, c_sort_col, c_sort_order = st.columns([2, 3, 2])
     
@@ -432,17 +425,26 @@ if st.session_state["show_results"]:
             "None", "price", "carat_weight", "weight_ratti", "sku", "name", 
             "gemstone", "cut", "shape"
         ]
-        sort_options = [c for c in sort_options if c == "None" or c in final_df.columns]
+        sort_options = [c for c in sort_options if c == "None" or c in df_processed.columns]
         
         sort_by = st.selectbox("Sort Data By", sort_options, index=0)
         
     with c_sort_order:
         sort_order = st.radio("Order", ["Ascending", "Descending"], horizontal=True)
 
-    # Apply Sorting
-    if sort_by and sort_by != "None":
-        ascending = (sort_order == "Ascending")
-        final_df = final_df.sort_values(by=sort_by, ascending=ascending)
+    # Apply Range Filters and Sorting to the dropdown-filtered query
+    final_df = engine.query(
+        query_state,
+        range_selections,
+        sort_by=sort_by if sort_by != "None" else None,
+        ascending=(sort_order == "Ascending"),
+    ).copy()
+
+    # Apply formatting to a new column so sorting (on original 'price') still works
+    final_df["display_price"] = final_df["price"].apply(format_price_display)
+
+    # --- Metrics (Answered from the Precomputed Cube) ---
+    show_analytics_panel()
 
     # --- Column Selector (LOCKED) ---
     view_cols = [
@@ -455,7 +457,7 @@ if st.session_state["show_results"]:
     if view_mode == "Table View":
         # --- Dataframe ---
         st.dataframe(
-            final_df[view_cols] if view_cols else final_df,
+            expand_urls(final_df[view_cols] if view_cols else final_df),
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -501,7 +503,7 @@ if st.session_state["show_results"]:
         # Slice Data
         start_idx = (st.session_state["current_page"] - 1) * ITEMS_PER_PAGE
         end_idx = start_idx + ITEMS_PER_PAGE
-        paginated_df = final_df.iloc[start_idx:end_idx]
+        paginated_df = expand_urls(final_df.iloc[start_idx:end_idx])
         
         # Grid View - Row based iteration for better alignment
         # We iterate in chunks of 4 to keep rows aligned
@@ -571,7 +573,7 @@ if st.session_state["show_results"]:
                              st.link_button("View Product", row['url_key'])
 
     # --- Download ---
-    csv_data = final_df.to_csv(index=False).encode('utf-8')
+    csv_data = expand_urls(final_df).to_csv(index=False).encode('utf-8')
     st.download_button(
         "Download Filtered CSV",
         data=csv_data,
@@ -580,4 +582,5 @@ if st.session_state["show_results"]:
     )
 
 else:
+    show_analytics_panel()
     st.info("👈 Please configure filters in the sidebar and click **'Step 3: Apply Filters'** to generate the report.")
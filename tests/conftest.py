@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _make_catalog(n=400, seed=7):
+    """A processed catalog with the awkward cases the filters must handle.
+
+    Facets mix real NaNs with the literal string "None", prices and carats
+    repeat (ties when sorting) and include NaN, and some prices are the
+    700000 "Call for Price" placeholder.
+    """
+    rng = np.random.default_rng(seed)
+    price = rng.choice([100.0, 250.0, 250.0, 900.0, 700000.0], n)
+    price[::9] = np.nan
+    return pd.DataFrame({
+        "sku": [f"GP{i:04d}" for i in range(n)],
+        "name": rng.choice(["Ruby 1", "Emerald 2", None], n),
+        "gemstone": pd.Categorical(rng.choice(["Ruby", "Emerald", "None", None], n)),
+        "shape": pd.Categorical(rng.choice(["Oval", "Round", None], n)),
+        "origin": pd.Categorical(rng.choice(["Burma", "Sri Lanka", None], n)),
+        "certification": pd.Categorical(rng.choice(["GIA", "IGI"], n)),
+        "price": price,
+        "carat_weight": rng.choice([0.5, 1.0, 1.25, np.nan], n),
+    })
+
+
+@pytest.fixture
+def make_catalog():
+    return _make_catalog
+
+
+@pytest.fixture
+def catalog():
+    return _make_catalog()
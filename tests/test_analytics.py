@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import CALL_FOR_PRICE, build_cube, select_cells, summarize
+
+
+@pytest.fixture
+def catalog(make_catalog):
+    df = make_catalog(n=1000, seed=3)
+    # Distinct carats as well, so the median search is not helped by ties
+    df["carat_weight"] = np.random.default_rng(3).uniform(0.5, 10.0, len(df))
+    return df
+
+
+def labels(series):
+    return series.astype(object).where(series.notna(), "None").astype(str)
+
+
+@pytest.mark.parametrize("selections", [
+    {},
+    {"gemstone": ["Ruby"]},
+    {"gemstone": ["None", "Emerald"], "origin": ["Burma"]},
+    {"gemstone": ["Ruby"], "shape": ["Oval"], "origin": ["None"], "certification": ["GIA"]},
+])
+def test_summary_matches_catalog(catalog, selections):
+    cube = build_cube(catalog)
+    summary = summarize(cube, select_cells(cube, selections))
+
+    mask = np.ones(len(catalog), dtype=bool)
+    for col, values in selections.items():
+        mask &= labels(catalog[col]).isin(values).to_numpy()
+    rows = catalog[mask]
+    prices = rows["price"][rows["price"] != CALL_FOR_PRICE].dropna()
+
+    assert summary["count"] == len(rows)
+    assert summary["call_for_price"] == (rows["price"] == CALL_FOR_PRICE).sum()
+    assert summary["price"] == {"min": prices.min(), "median": prices.median(), "max": prices.max()}
+    assert summary["carat_weight"]["median"] == rows["carat_weight"].median()
+
+
+def test_whole_catalog_summary_is_precomputed(catalog):
+    cube = build_cube(catalog)
+    assert summarize(cube, select_cells(cube, {})) is cube.total
+    assert cube.total["count"] == len(catalog)
+
+
+def test_non_cube_selections_are_ignored(catalog):
+    cube = build_cube(catalog)
+    assert len(select_cells(cube, {"cut": ["Faceted"]})) == len(cube.cells)
+
+
+def test_empty_selection(catalog):
+    cube = build_cube(catalog)
+    summary = summarize(cube, select_cells(cube, {"gemstone": ["Sapphire"]}))
+    assert summary["count"] == 0
+    assert summary["price"] == {"min": None, "median": None, "max": None}
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import FACET_COLUMNS, compact_dataframe, expand_urls, process_dataframe
+
+
+@pytest.fixture
+def export():
+    """A raw report export, as read from the server CSV."""
+    rng = np.random.default_rng(11)
+    n = 300
+    df = pd.DataFrame({
+        "attribute_set_id": rng.choice(["Gemstones", "Jewellery"], n, p=[0.9, 0.1]),
+        "sku": [f"GP{i}" for i in range(n)],
+        "qty": rng.choice(["1", "0", "3"], n),
+        "is_in_stock": rng.choice([1, 1, 0], n),
+        "product_type": rng.choice(["Loose", "Pendant", None], n),
+        "price": rng.choice([0.0, 1500.0, 700000.0, 42000.0], n),
+        "carat_weight": rng.uniform(0.5, 8.0, n).astype(str),
+        "url_key": [f"/ruby-{i}" if i % 13 else None for i in range(n)],
+        "image": [f"g/p/gp{i}.jpg" if i % 7 else None for i in range(n)],
+    })
+    for col in FACET_COLUMNS:
+        if col != "product_type":
+            df[col] = rng.choice(["A", "B", "None", None], n)
+    return df
+
+
+def test_urls_round_trip(export):
+    processed = process_dataframe(export.copy())
+    compact, _ = compact_dataframe(processed.copy())
+    expanded = expand_urls(compact)
+
+    assert (processed["url_key"] == "https://www.gempundit.com/products/").any()
+    assert (processed["image"] == "").any()
+    pd.testing.assert_series_equal(expanded["url_key"], processed["url_key"])
+    pd.testing.assert_series_equal(expanded["image"], processed["image"])
+
+
+def test_facets_are_categorical(export):
+    compact, _ = compact_dataframe(process_dataframe(export.copy()))
+    for col in FACET_COLUMNS:
+        assert isinstance(compact[col].dtype, pd.CategoricalDtype)
+    assert compact["price"].dtype == float
+
+
+def test_memory_saved(export):
+    processed = process_dataframe(export.copy())
+    compact, saved = compact_dataframe(processed)
+    assert saved > 0
+    assert compact.memory_usage(deep=True).sum() < processed.memory_usage(deep=True).sum()
@@ -0,0 +1,145 @@
+import gc
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_engine import DuckDBEngine, PandasEngine, duckdb
+
+requires_duckdb = pytest.mark.skipif(duckdb is None, reason="duckdb is not installed")
+
+
+FACETS = [
+    {},
+    {"gemstone": ["None"]},
+    {"gemstone": ["Ruby", "None"], "shape": ["Oval"]},
+    {"shape": ["None", "Round"], "origin": ["Burma"]},
+    {"gemstone": ["Sapphire"]},
+]
+
+RANGES = [
+    {},
+    {"price": (100.0, 900.0)},
+    {"price": (0.0, 1e9), "carat_weight": (0.75, 1.25)},
+]
+
+SORTS = [None, "price", "carat_weight", "gemstone", "sku", "name"]
+
+
+def run(engine, df, facets, ranges=None, sort_by=None, ascending=True):
+    # sku and name are left out so sorting on them takes the sort-only path
+    state = engine.scan(df, ["gemstone", "shape", "origin", "price", "carat_weight"])
+    options = {}
+    for col, values in facets.items():
+        options[col] = engine.facet_options(state, col)
+        state = engine.filter_facet(state, col, values)
+    for col in ["gemstone", "shape", "origin"]:
+        options.setdefault(col, engine.facet_options(state, col))
+    if ranges is None:
+        return options
+    return options, engine.query(state, ranges, sort_by=sort_by, ascending=ascending)
+
+
+def baseline(df, facets, ranges, sort_by=None, ascending=True):
+    """The dashboard's original filter loop, on plain object columns."""
+    current = df.astype({c: object for c in ["gemstone", "shape", "origin"]})
+    options = {}
+    for col, values in facets.items():
+        options[col] = sorted(current[col].fillna("None").astype(str).unique())
+        mask = pd.Series(False, index=current.index)
+        for v in values:
+            if v == "None":
+                mask |= (current[col].isna()) | (current[col] == "None")
+            else:
+                mask |= (current[col] == v)
+        current = current[mask]
+    for col in ["gemstone", "shape", "origin"]:
+        options.setdefault(col, sorted(current[col].fillna("None").astype(str).unique()))
+
+    for col, (sel_min, sel_max) in ranges.items():
+        current = current[(current[col] >= sel_min) & (current[col] <= sel_max)]
+    if sort_by:
+        current = current.sort_values(by=sort_by, ascending=ascending)
+    return options, current
+
+
+@pytest.mark.parametrize(
+    "facets,ranges,sort_by,ascending",
+    list(itertools.product(FACETS, RANGES, SORTS, [True, False])),
+)
+def test_pandas_engine_matches_baseline(catalog, facets, ranges, sort_by, ascending):
+    options, rows = run(PandasEngine(), catalog, facets, ranges, sort_by, ascending)
+    expected_options, expected = baseline(catalog, facets, ranges, sort_by, ascending)
+
+    assert options == expected_options
+    assert sorted(rows.index) == sorted(expected.index)
+    if sort_by:
+        # The baseline sort is not stable, so only the order of the keys is compared
+        pd.testing.assert_series_equal(
+            rows[sort_by].astype(object).reset_index(drop=True),
+            expected[sort_by].astype(object).reset_index(drop=True),
+        )
+    else:
+        assert list(rows.index) == list(expected.index)
+
+
+def test_pandas_none_option_covers_nan_and_string(catalog):
+    options = run(PandasEngine(), catalog, {})
+    assert options["gemstone"] == ["Emerald", "None", "Ruby"]
+    _, rows = run(PandasEngine(), catalog, {"gemstone": ["None"]}, {})
+    assert len(rows) == (catalog["gemstone"].isna() | (catalog["gemstone"] == "None")).sum()
+
+
+def test_pandas_range_excludes_nan(catalog):
+    _, rows = run(PandasEngine(), catalog, {}, {"price": (0.0, 1e9)})
+    assert rows["price"].notna().all()
+    assert len(rows) == catalog["price"].notna().sum()
+
+
+@requires_duckdb
+@pytest.mark.parametrize("facets", FACETS)
+def test_facet_options_match(catalog, facets):
+    assert run(PandasEngine(), catalog, facets) == run(DuckDBEngine(), catalog, facets)
+
+
+@requires_duckdb
+def test_none_option_covers_nan_and_string(catalog):
+    _, rows = run(DuckDBEngine(), catalog, {"gemstone": ["None"]}, {})
+    assert len(rows) == (catalog["gemstone"].isna() | (catalog["gemstone"] == "None")).sum()
+
+
+@requires_duckdb
+@pytest.mark.parametrize(
+    "facets,ranges,sort_by,ascending",
+    list(itertools.product(FACETS, RANGES, SORTS, [True, False])),
+)
+def test_query_matches(catalog, facets, ranges, sort_by, ascending):
+    _, expected = run(PandasEngine(), catalog, facets, ranges, sort_by, ascending)
+    _, actual = run(DuckDBEngine(), catalog, facets, ranges, sort_by, ascending)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@requires_duckdb
+def test_range_excludes_nan(catalog):
+    _, rows = run(DuckDBEngine(), catalog, {}, {"price": (0.0, 1e9)})
+    assert rows["price"].notna().all()
+    assert len(rows) == catalog["price"].notna().sum()
+
+
+@requires_duckdb
+def test_new_version_keeps_tables_in_use(catalog):
+    engine = DuckDBEngine()
+    columns = ["gemstone", "shape", "price"]
+    state = engine.filter_facet(engine.scan(catalog, columns, version=1), "gemstone", ["Ruby"])
+
+    # Another session picks up a new data version while the first is still running
+    newer = engine.scan(catalog.iloc[::2], columns, version=2)
+    rows = engine.query(state, {"price": (0.0, 1e9)}, sort_by="price")
+    assert (rows["gemstone"] == "Ruby").all()
+
+    # Once the first session is done, its table is dropped on the next scan
+    del state, rows
+    gc.collect()
+    engine.scan(catalog.iloc[::2], columns, version=2)
+    assert list(engine._users) == [newer[2]]